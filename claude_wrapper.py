@@ -15,6 +15,10 @@ Usage:
 import subprocess
 import json
 import time
+import threading
+import queue
+import atexit
+import mmap
 import os
 import sys
 import argparse
@@ -22,6 +26,26 @@ from pathlib import Path
 from datetime import datetime
 from typing import Optional
 
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+# orjson en/decodes JSONL records several times faster than stdlib json
+# and returns bytes directly; fall back to stdlib when not installed.
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+    _loads = json.loads
+
 # Protocol files
 PROTOCOL_DIR = Path(os.environ.get("AGENT_PROTOCOL_DIR", "."))
 COMMANDS_FILE = PROTOCOL_DIR / "commands.jsonl"
@@ -29,69 +53,263 @@ OUTPUT_FILE = PROTOCOL_DIR / "output.jsonl"
 LOG_FILE = PROTOCOL_DIR / "log.jsonl"
 STATUS_FILE = PROTOCOL_DIR / "status.json"
 
-# Track processed commands
-PROCESSED_FILE = PROTOCOL_DIR / ".processed_commands"
+# High-watermark journal: commands.jsonl is append-only, so a single byte
+# offset replaces the old per-id .processed_commands scan.
+WATERMARK_FILE = PROTOCOL_DIR / ".commands_offset"
+
+# Environment for claude subprocesses, built once instead of copying
+# os.environ on every call. Changes to os.environ after import are not
+# picked up.
+_CLAUDE_ENV = {
+    **os.environ,
+    "TERM": "dumb",
+    "NO_COLOR": "1",
+}
+
+
+# Background writer: log()/write_output()/set_status() enqueue records and
+# return immediately; a daemon thread drains the queue in batches through
+# persistently-open file handles, so each record costs one amortized
+# write() instead of an open/write/close triple on the caller's thread.
+_write_q: queue.Queue = queue.Queue()
+_BATCH_MAX = 256
+
+
+def _write_drain():
+    fds = {}
+    while True:
+        batch = [_write_q.get()]
+        while len(batch) < _BATCH_MAX:
+            try:
+                batch.append(_write_q.get_nowait())
+            except queue.Empty:
+                break
+
+        # Stamp once per batch: records land within milliseconds of each
+        # other, so one datetime.now().isoformat() covers them all.
+        ts = datetime.now().isoformat()
+
+        status = None
+        appends = {}  # path -> list of encoded lines
+        flushes = []
+        for kind, path, entry in batch:
+            if kind == "flush":
+                flushes.append(entry)
+            elif kind == "status":
+                # Coalesce: only the newest status in the batch matters
+                entry.setdefault("updated_at", ts)
+                status = entry
+            else:
+                entry.setdefault("timestamp", ts)
+                appends.setdefault(path, []).append(_dumps(entry) + b"\n")
+
+        # A failed write (disk full, permissions, rotated-away dir) drops
+        # this batch but must not kill the thread: the rest of the run
+        # would otherwise lose every record and exit would hang waiting
+        # for a drain that never comes.
+        for path, lines in appends.items():
+            try:
+                fd = fds.get(path)
+                if fd is None:
+                    fd = fds[path] = os.open(
+                        path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_CLOEXEC, 0o644
+                    )
+                if hasattr(os, "writev"):
+                    # Gather-write the whole batch in one syscall without
+                    # first join()ing the buffers in userspace
+                    os.writev(fd, lines)
+                else:
+                    os.write(fd, b"".join(lines))
+                if hasattr(os, "posix_fadvise"):
+                    # This process never re-reads old log/output bytes; keep
+                    # them from piling up in the page cache.
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError as e:
+                print(f"Write error on {path}: {e}", file=sys.stderr)
+                # Drop the cached fd so the next batch reopens the file;
+                # the error may be stuck to this descriptor.
+                fd = fds.pop(path, None)
+                if fd is not None:
+                    try:
+                        os.close(fd)
+                    except OSError:
+                        pass
+
+        if status is not None:
+            # Serialize once, write a temp sibling, then rename: readers
+            # never see a truncated or half-written status.json.
+            try:
+                tmp = STATUS_FILE.with_suffix(".tmp")
+                with open(tmp, "wb") as f:
+                    f.write(_dumps(status))
+                os.replace(tmp, STATUS_FILE)
+            except OSError as e:
+                print(f"Write error on {STATUS_FILE}: {e}", file=sys.stderr)
+
+        for _ in batch:
+            _write_q.task_done()
+        for event in flushes:
+            event.set()
+
+
+def _flush_writes(timeout: float = 5.0):
+    """Wait (bounded) until the writer has drained everything queued so far.
+
+    A sentinel through the queue instead of Queue.join(): if the writer
+    thread has died, join() would block interpreter shutdown forever.
+    """
+    done = threading.Event()
+    _write_q.put(("flush", None, done))
+    done.wait(timeout)
+
+
+threading.Thread(target=_write_drain, daemon=True).start()
+atexit.register(_flush_writes)  # flush anything still queued on exit
 
 
 def log(level: str, msg: str, **extra):
-    """Write to log file and print."""
+    """Queue a log record for the background writer and print."""
     entry = {
-        "timestamp": datetime.now().isoformat(),
         "level": level,
         "message": msg,
         **extra,
     }
-    with open(LOG_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    _write_q.put(("append", LOG_FILE, entry))
     print(f"[{level.upper()}] {msg}")
 
 
 def set_status(state: str, task: str = None, detail: str = None):
-    """Update status file."""
-    with open(STATUS_FILE, "w") as f:
-        json.dump({
-            "state": state,
-            "task": task,
-            "detail": detail,
-            "updated_at": datetime.now().isoformat(),
-        }, f, indent=2)
+    """Update status file (written by the background writer, coalesced)."""
+    _write_q.put(("status", STATUS_FILE, {
+        "state": state,
+        "task": task,
+        "detail": detail,
+    }))
+
+
+def _load_watermark() -> int:
+    """Last consumed byte offset into COMMANDS_FILE (0 if none saved)."""
+    try:
+        return int.from_bytes(WATERMARK_FILE.read_bytes(), "little")
+    except (FileNotFoundError, ValueError):
+        return 0
+
 
+_watermark_fd = None
 
-def get_processed_ids() -> set:
-    """Get set of already-processed command IDs."""
-    if not PROCESSED_FILE.exists():
-        return set()
-    return set(PROCESSED_FILE.read_text().strip().split("\n"))
+
+def _save_watermark(offset: int):
+    """Persist the consumed offset with a single pwrite.
+
+    The record is a fixed 8 bytes overwritten in place, so there's no
+    temp-file/rename churn and no locking: one syscall per processed
+    command, and readers never see a partially-sized file.
+    """
+    global _watermark_fd
+    if _watermark_fd is None:
+        _watermark_fd = os.open(
+            WATERMARK_FILE, os.O_WRONLY | os.O_CREAT | os.O_CLOEXEC, 0o644
+        )
+    os.pwrite(_watermark_fd, offset.to_bytes(8, "little"), 0)
+
+
+# Incremental tail state for COMMANDS_FILE ("tail -f" pattern): remember
+# where the last read stopped so each check only parses new bytes. The
+# offset survives restarts via the 8-byte watermark file.
+_tail_state = {"inode": None, "offset": _load_watermark(), "partial": b""}
+# End-of-line offsets for commands handed out but not yet marked processed
+_batch_offsets: dict = {}
 
 
 def mark_processed(cmd_id: str):
-    """Mark a command as processed."""
-    with open(PROCESSED_FILE, "a") as f:
-        f.write(cmd_id + "\n")
+    """Mark a command as processed by advancing the persisted watermark."""
+    offset = _batch_offsets.pop(cmd_id, None)
+    if offset is not None:
+        _save_watermark(offset)
+
+
+# Unread spans at least this large (e.g. catching up on a long backlog
+# after restart) are scanned through an mmap instead of read into memory
+_MMAP_THRESHOLD = 1 << 20
+
+
+def _scan_lines(buf, lo: int, hi: int, base: int) -> tuple[list[dict], int]:
+    """Parse complete JSONL lines from buf[lo:hi].
+
+    Works on bytes or an mmap: lines are located with find() so only each
+    line's own bytes are ever copied out. `base` is the file offset of
+    buf[0]; per-command end-of-line offsets land in _batch_offsets.
+    Returns (commands, first unconsumed position in buf).
+    """
+    pending = []
+    pos = lo
+    while True:
+        nl = buf.find(b"\n", pos, hi)
+        if nl < 0:
+            break
+        line = bytes(buf[pos:nl]).strip()
+        pos = nl + 1
+        if line:
+            cmd = _loads(line)
+            cmd_id = cmd.get("id")
+            if cmd_id:
+                _batch_offsets[cmd_id] = base + pos
+            pending.append(cmd)
+    return pending, pos
 
 
 def get_pending_commands() -> list[dict]:
-    """Get unprocessed commands."""
-    if not COMMANDS_FILE.exists():
+    """Get unprocessed commands.
+
+    Tails COMMANDS_FILE incrementally: only bytes appended since the last
+    call are read and parsed, so cost is O(new data) rather than
+    O(everything ever submitted). Truncation is detected via the file
+    size and resets the tail to the start. Large unread spans are scanned
+    zero-copy through an mmap.
+    """
+    try:
+        st = os.stat(COMMANDS_FILE)
+    except FileNotFoundError:
         return []
 
-    processed = get_processed_ids()
-    pending = []
+    if _tail_state["inode"] is None:
+        _tail_state["inode"] = st.st_ino
+    if st.st_ino != _tail_state["inode"] or st.st_size < _tail_state["offset"]:
+        _tail_state.update(inode=st.st_ino, offset=0, partial=b"")
 
-    with open(COMMANDS_FILE) as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                cmd = json.loads(line)
-                if cmd.get("id") not in processed:
-                    pending.append(cmd)
+    if st.st_size == _tail_state["offset"]:
+        return []
 
+    span = st.st_size - _tail_state["offset"]
+    if span >= _MMAP_THRESHOLD and not _tail_state["partial"]:
+        fd = os.open(COMMANDS_FILE, os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            mm = mmap.mmap(fd, st.st_size, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        with mm:
+            pending, pos = _scan_lines(mm, _tail_state["offset"], st.st_size, 0)
+            _tail_state["partial"] = bytes(mm[pos:st.st_size])
+        _tail_state["offset"] = st.st_size
+        return pending
+
+    start = _tail_state["offset"] - len(_tail_state["partial"])
+    with open(COMMANDS_FILE, "rb") as f:
+        f.seek(_tail_state["offset"])
+        data = _tail_state["partial"] + f.read()
+        _tail_state["offset"] = f.tell()
+
+    pending, pos = _scan_lines(data, 0, len(data), start)
+    # Incomplete trailing line (b"" if data ended in a newline) waits for
+    # the rest to be appended.
+    _tail_state["partial"] = data[pos:]
     return pending
 
 
-def run_claude(prompt: str, workdir: str = None) -> tuple[int, str]:
+def run_claude(prompt: str, workdir: str = None, timeout: float = 600.0) -> tuple[int, str]:
     """
-    Run Claude Code in print mode.
+    Run Claude Code in print mode, streaming its output as it arrives
+    instead of buffering everything behind capture_output.
     Returns (exit_code, output).
     """
     cmd = [
@@ -104,45 +322,69 @@ def run_claude(prompt: str, workdir: str = None) -> tuple[int, str]:
     log("info", f"Running claude with prompt: {prompt[:100]}...")
 
     try:
-        result = subprocess.run(
+        proc = subprocess.Popen(
             cmd,
-            input=prompt,
-            capture_output=True,
-            text=True,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            bufsize=0,  # unbuffered: reads return whatever the child wrote
             cwd=workdir or os.getcwd(),
-            timeout=600,  # 10 min timeout
-            env={
-                **os.environ,
-                "TERM": "dumb",
-                "NO_COLOR": "1",
-            },
+            env=_CLAUDE_ENV,
         )
+    except FileNotFoundError:
+        return -1, "ERROR: 'claude' command not found. Is Claude Code installed?"
+    except Exception as e:
+        return -1, f"ERROR: {e}"
 
-        output = result.stdout
-        if result.stderr:
-            output += f"\n[stderr]: {result.stderr}"
+    def _feed_stdin():
+        try:
+            proc.stdin.write(prompt.encode() + b"\n")
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
 
-        return result.returncode, output
+    threading.Thread(target=_feed_stdin, daemon=True).start()
 
-    except subprocess.TimeoutExpired:
-        return -1, "ERROR: Claude timed out after 10 minutes"
-    except FileNotFoundError:
-        return -1, "ERROR: 'claude' command not found. Is Claude Code installed?"
+    # Kill on deadline from the side rather than subprocess.run's
+    # all-or-nothing timeout= (which also buffered all output in memory
+    # until EOF anyway).
+    timed_out = threading.Event()
+
+    def _watchdog():
+        timed_out.set()
+        proc.kill()
+
+    watchdog = threading.Timer(timeout, _watchdog)
+    watchdog.daemon = True
+    watchdog.start()
+
+    buf = bytearray()
+    try:
+        for chunk in iter(lambda: proc.stdout.read(65536), b""):
+            buf += chunk
+        exit_code = proc.wait()
     except Exception as e:
+        proc.kill()
         return -1, f"ERROR: {e}"
+    finally:
+        watchdog.cancel()
+
+    if timed_out.is_set():
+        return -1, f"ERROR: Claude timed out after {int(timeout)} seconds"
+
+    # Decode once at the boundary instead of per-chunk text mode
+    return exit_code, bytes(buf).decode("utf-8", errors="replace")
 
 
 def write_output(cmd_id: str, prompt: str, response: str, exit_code: int):
     """Write response to output file."""
     entry = {
         "id": cmd_id,
-        "timestamp": datetime.now().isoformat(),
         "prompt": prompt,
         "response": response,
         "exit_code": exit_code,
     }
-    with open(OUTPUT_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
+    _write_q.put(("append", OUTPUT_FILE, entry))
 
 
 def handle_command(cmd: dict):
@@ -175,9 +417,34 @@ def handle_command(cmd: dict):
         set_status("idle")
 
 
+def _status_heartbeat(interval: float = 10.0):
+    """Periodically touch the status file so watchers can tell we're alive."""
+    while True:
+        time.sleep(interval)
+        try:
+            os.utime(STATUS_FILE)
+        except OSError:
+            pass
+
+
+def _process_pending():
+    """Drain and handle all currently pending commands."""
+    for cmd in get_pending_commands():
+        handle_command(cmd)
+
+
 def watch_loop(poll_interval: float = 2.0):
-    """Main loop - watch for commands and process them."""
-    log("info", "Claude wrapper started, watching for commands...")
+    """Main loop - watch for commands and process them.
+
+    Uses OS filesystem events (via watchfiles) when available, so new
+    commands are picked up in milliseconds with zero idle CPU. Falls back
+    to polling when watchfiles is missing or AGENT_FORCE_POLL is set
+    (e.g. on NFS/CIFS mounts where inotify doesn't fire).
+    """
+    use_events = watchfiles is not None and not os.environ.get("AGENT_FORCE_POLL")
+
+    log("info", "Claude wrapper started, watching for commands...",
+        mode="events" if use_events else "poll")
     set_status("idle", detail="Waiting for tasks")
 
     # Ensure files exist
@@ -189,11 +456,34 @@ def watch_loop(poll_interval: float = 2.0):
     print(f"Read output from: {OUTPUT_FILE}")
     print()
 
+    threading.Thread(target=_status_heartbeat, daemon=True).start()
+
+    if use_events:
+        try:
+            # Catch up on anything written before we started watching
+            _process_pending()
+            # Watch the file itself (not the directory) to avoid fan-out
+            # from unrelated writes in PROTOCOL_DIR. yield_on_timeout
+            # turns the rust_timeout into a 10s housekeeping sweep that
+            # catches anything appended before the watcher armed or
+            # whose event was missed.
+            for _changes in watchfiles.watch(COMMANDS_FILE, rust_timeout=10_000,
+                                             yield_on_timeout=True):
+                try:
+                    _process_pending()
+                except Exception as e:
+                    log("error", f"Error processing commands: {e}")
+            return
+        except KeyboardInterrupt:
+            log("info", "Interrupted")
+            set_status("stopped")
+            return
+        except Exception as e:
+            log("error", f"File watcher failed, falling back to polling: {e}")
+
     while True:
         try:
-            pending = get_pending_commands()
-            for cmd in pending:
-                handle_command(cmd)
+            _process_pending()
         except KeyboardInterrupt:
             log("info", "Interrupted")
             set_status("stopped")
@@ -18,8 +18,26 @@ import sys
 import httpx
 import os
 
+# orjson decodes SSE payloads several times faster than stdlib json; its
+# JSONDecodeError subclasses json's, so except clauses work unchanged.
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
 DEFAULT_SERVER = os.environ.get("CLAUDE_BOX_SERVER", "http://localhost:8080")
 
+# Shared HTTP client: reuses the TCP (and TLS) connection across calls
+# instead of a fresh handshake per request.
+_client = None
+
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        _client = httpx.Client(timeout=30)
+    return _client
+
 
 def send_task(server: str, prompt: str, workdir: str = None):
     """Send task and stream SSE output."""
@@ -31,11 +49,18 @@ def send_task(server: str, prompt: str, workdir: str = None):
     if workdir:
         payload["workdir"] = workdir
 
-    with httpx.stream(
+    with get_client().stream(
         "POST",
         f"{server}/task",
         json=payload,
-        timeout=None,  # No timeout for streaming
+        headers={
+            # Hint any intermediary proxy (nginx/APISIX) to pass events
+            # through instead of coalescing them into ~4KB chunks
+            "Accept": "text/event-stream",
+            "X-Accel-Buffering": "no",
+            "Cache-Control": "no-transform",
+        },
+        timeout=httpx.Timeout(None, connect=5.0),  # No read timeout for streaming
     ) as response:
         if response.status_code == 409:
             data = response.json()
@@ -47,81 +72,89 @@ def send_task(server: str, prompt: str, workdir: str = None):
             print(response.text)
             sys.exit(1)
 
-        # Parse SSE stream
+        # Parse the SSE stream at the byte level: iter_raw() + a bytearray
+        # avoids the per-line str allocation and re-decode of iter_lines();
+        # only the data: payload is decoded (json.loads accepts bytes).
         event_type = None
-        data_buffer = ""
-
-        for line in response.iter_lines():
-            line = line.strip()
-
-            if line.startswith("event:"):
-                event_type = line[6:].strip()
-            elif line.startswith("data:"):
-                data_buffer = line[5:].strip()
+        buf = bytearray()
 
-                try:
-                    data = json.loads(data_buffer)
-                except json.JSONDecodeError:
-                    continue
+        for chunk in response.iter_raw(chunk_size=64 * 1024):
+            buf += chunk
+            while (nl := buf.find(b"\n")) >= 0:
+                line = bytes(buf[:nl]).strip()
+                del buf[:nl + 1]
 
-                # Handle events
-                if event_type == "start":
-                    print(f"[STARTED] Task ID: {data.get('task_id')}")
-                    print("-" * 60)
-
-                elif event_type == "output":
-                    line_text = data.get("line", "")
-                    # Try to parse as JSON (Claude's stream-json format)
+                if line.startswith(b"event:"):
+                    event_type = line[6:].strip().decode()
+                elif line.startswith(b"data:"):
                     try:
-                        parsed = json.loads(line_text)
-                        if parsed.get("type") == "assistant":
-                            content = parsed.get("message", {}).get("content", [])
-                            for block in content:
-                                if block.get("type") == "text":
-                                    print(block.get("text", ""), end="", flush=True)
-                                elif block.get("type") == "tool_use":
-                                    print(f"\n[TOOL] {block.get('name')}: {block.get('input', {})}")
-                        elif parsed.get("type") == "result":
-                            print(f"\n[RESULT] Cost: ${parsed.get('cost_usd', 0):.4f}")
+                        data = _loads(line[5:])
                     except json.JSONDecodeError:
-                        # Plain text output
-                        print(line_text)
-
-                elif event_type == "done":
-                    print("-" * 60)
-                    state = data.get("state", "unknown")
-                    exit_code = data.get("exit_code", -1)
-                    print(f"[{state.upper()}] Exit code: {exit_code}")
-
-                elif event_type == "error":
-                    print(f"[ERROR] {data.get('error')}")
-
-                elif event_type == "cancelled":
-                    print("[CANCELLED] Task was stopped")
-
-                data_buffer = ""
-                event_type = None
-
-            elif line.startswith(":"):
-                # Comment/heartbeat, ignore
-                pass
+                        continue
+                    handle_event(event_type, data)
+                    event_type = None
+                elif line.startswith(b":"):
+                    # Comment/heartbeat, ignore
+                    pass
+
+
+def handle_event(event_type: str, data: dict):
+    """Handle a single parsed SSE event."""
+    if event_type == "start":
+        print(f"[STARTED] Task ID: {data.get('task_id')}")
+        print("-" * 60)
+
+    elif event_type == "output":
+        line_text = data.get("line", "")
+        # Stream-json lines always start with '{'; checking first avoids
+        # paying for a raised-and-caught decode error on every plain-text
+        # line, which is the common case for non-JSON output.
+        if line_text[:1] != "{":
+            print(line_text)
+            return
+        try:
+            parsed = _loads(line_text)
+            if parsed.get("type") == "assistant":
+                content = parsed.get("message", {}).get("content", [])
+                for block in content:
+                    if block.get("type") == "text":
+                        print(block.get("text", ""), end="", flush=True)
+                    elif block.get("type") == "tool_use":
+                        print(f"\n[TOOL] {block.get('name')}: {block.get('input', {})}")
+            elif parsed.get("type") == "result":
+                print(f"\n[RESULT] Cost: ${parsed.get('cost_usd', 0):.4f}")
+        except json.JSONDecodeError:
+            # Plain text output
+            print(line_text)
+
+    elif event_type == "done":
+        print("-" * 60)
+        state = data.get("state", "unknown")
+        exit_code = data.get("exit_code", -1)
+        print(f"[{state.upper()}] Exit code: {exit_code}")
+
+    elif event_type == "error":
+        print(f"[ERROR] {data.get('error')}")
+
+    elif event_type == "cancelled":
+        print("[CANCELLED] Task was stopped")
 
 
 def get_status(server: str):
     """Get current agent status."""
-    response = httpx.get(f"{server}/status")
+    response = get_client().get(f"{server}/status")
     print(json.dumps(response.json(), indent=2))
 
 
 def stop_task(server: str):
     """Stop current task."""
-    response = httpx.post(f"{server}/stop")
+    response = get_client().post(f"{server}/stop")
     print(json.dumps(response.json(), indent=2))
 
 
 def get_history(server: str, limit: int = 10):
     """Get task history."""
-    response = httpx.get(f"{server}/history", params={"limit": limit})
+    response = get_client().get(f"{server}/history", params={"limit": limit})
     data = response.json()
 
     for task in data.get("history", []):
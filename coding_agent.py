@@ -10,11 +10,25 @@ This agent can:
 """
 
 import os
+import re
 import subprocess
 import json
 import time
+import threading
 from pathlib import Path
-from protocol import AgentProtocol
+from protocol import AgentProtocol, COMMANDS_FILE
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+# One precompiled alternation beats looping `pattern in cmd.lower()` over
+# each pattern: a single C-level scan, no throwaway lowered copy.
+_DANGEROUS_RE = re.compile(
+    r"rm\s+-r[f]?\b|git\s+push\s+-f\b|drop\s+table|truncate",
+    re.IGNORECASE,
+)
 
 # Force non-interactive mode for all tools
 ENV_OVERRIDES = {
@@ -50,13 +64,10 @@ class CodingAgent:
         """Run a shell command non-interactively."""
 
         # Check for dangerous commands
-        dangerous_patterns = ["rm -rf", "rm -r", "git push -f", "drop table", "truncate"]
-        if confirm_if_dangerous:
-            for pattern in dangerous_patterns:
-                if pattern in cmd.lower():
-                    if not self.protocol.confirm(f"Run dangerous command?\n{cmd}"):
-                        self.log(f"User cancelled dangerous command: {cmd}", "warn")
-                        raise RuntimeError("User cancelled")
+        if confirm_if_dangerous and _DANGEROUS_RE.search(cmd):
+            if not self.protocol.confirm(f"Run dangerous command?\n{cmd}"):
+                self.log(f"User cancelled dangerous command: {cmd}", "warn")
+                raise RuntimeError("User cancelled")
 
         self.log(f"Running: {cmd}")
 
@@ -85,10 +96,33 @@ class CodingAgent:
             raise
 
     def read_file(self, path: str) -> str:
-        """Read a file."""
+        """Read a file.
+
+        Uses a raw fd with a sequential-access hint so the kernel
+        prefetches ahead of the read, and decodes once at the end instead
+        of through a TextIOWrapper. Once-read source files are dropped
+        from the page cache afterwards.
+        """
         full_path = self.workdir / path
         self.log(f"Reading: {full_path}")
-        return full_path.read_text()
+
+        fd = os.open(str(full_path), os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            size = os.fstat(fd).st_size
+            chunks = []
+            while True:
+                chunk = os.read(fd, max(size, 1 << 16))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+        return b"".join(chunks).decode("utf-8")
 
     def write_file(self, path: str, content: str, confirm: bool = True):
         """Write a file, optionally confirming with user."""
@@ -101,7 +135,18 @@ class CodingAgent:
 
         self.log(f"Writing: {full_path}")
         full_path.parent.mkdir(parents=True, exist_ok=True)
-        full_path.write_text(content)
+
+        data = memoryview(content.encode("utf-8"))
+        fd = os.open(
+            str(full_path),
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_CLOEXEC,
+            0o644,
+        )
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
         return True
 
     def git_commit(self, message: str, add_all: bool = False):
@@ -153,6 +198,16 @@ def main():
     print("Coding agent running. Use respond.py to interact.")
     print()
 
+    # Wake on filesystem events instead of a fixed 1s sleep; the wait
+    # timeout below is the polling fallback when watchfiles is missing.
+    wake = threading.Event()
+    if watchfiles is not None:
+        def _watch():
+            for _ in watchfiles.watch(COMMANDS_FILE):
+                wake.set()
+
+        threading.Thread(target=_watch, daemon=True).start()
+
     while True:
         cmd = agent.protocol.check_commands()
         if cmd:
@@ -170,49 +225,55 @@ def main():
                 except Exception as e:
                     agent.log(f"Task failed: {e}", "error")
                 agent.status("idle")
-
-        time.sleep(1)
+        else:
+            wake.wait(timeout=1.0 if watchfiles is None else 10.0)
+            wake.clear()
 
 
 def execute_task(agent: CodingAgent, task: str):
     """Execute a task - this is where your LLM integration would go."""
-    agent.log(f"Executing task: {task}")
-
-    # In a real implementation, this would:
-    # 1. Send the task to an LLM
-    # 2. Parse the LLM's response for tool calls
-    # 3. Execute tools using this agent's methods
-    # 4. Loop until task complete
-
-    # Demo: simple command interpreter
-    if task.startswith("run:"):
-        cmd = task[4:].strip()
-        agent.run_cmd(cmd)
-
-    elif task.startswith("read:"):
-        path = task[5:].strip()
-        content = agent.read_file(path)
-        agent.log(f"File content:\n{content[:500]}...")
-
-    elif task.startswith("write:"):
-        # Format: write:path:content
-        parts = task[6:].split(":", 1)
-        if len(parts) == 2:
-            agent.write_file(parts[0].strip(), parts[1])
-
-    elif task == "git status":
-        agent.run_cmd("git status")
-
-    elif task.startswith("commit:"):
-        message = task[7:].strip()
-        agent.git_commit(message, add_all=True)
-
-    else:
-        # Unknown task - ask for clarification
-        clarified = agent.protocol.ask(
-            f"I don't understand the task:\n{task}\n\nCan you rephrase or give me a specific command?"
-        )
-        execute_task(agent, clarified)
+    # Clarification loops back here rather than recursing, so arbitrarily
+    # many rounds keep O(1) stack depth.
+    while True:
+        agent.log(f"Executing task: {task}")
+
+        # In a real implementation, this would:
+        # 1. Send the task to an LLM
+        # 2. Parse the LLM's response for tool calls
+        # 3. Execute tools using this agent's methods
+        # 4. Loop until task complete
+
+        # Demo: simple command interpreter
+        if task.startswith("run:"):
+            cmd = task[4:].strip()
+            agent.run_cmd(cmd)
+
+        elif task.startswith("read:"):
+            path = task[5:].strip()
+            content = agent.read_file(path)
+            agent.log(f"File content:\n{content[:500]}...")
+
+        elif task.startswith("write:"):
+            # Format: write:path:content
+            parts = task[6:].split(":", 1)
+            if len(parts) == 2:
+                agent.write_file(parts[0].strip(), parts[1])
+
+        elif task == "git status":
+            agent.run_cmd("git status")
+
+        elif task.startswith("commit:"):
+            message = task[7:].strip()
+            agent.git_commit(message, add_all=True)
+
+        else:
+            # Unknown task - ask for clarification and try again
+            task = agent.protocol.ask(
+                f"I don't understand the task:\n{task}\n\nCan you rephrase or give me a specific command?"
+            )
+            continue
+
+        return
 
 
 if __name__ == "__main__":
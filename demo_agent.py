@@ -5,15 +5,24 @@ Run this, then use respond.py to interact with it.
 """
 
 import time
+import threading
 import subprocess
 import os
-from protocol import AgentProtocol
+from protocol import AgentProtocol, COMMANDS_FILE
+
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
 
 # Make all tools non-interactive
 os.environ.setdefault("DEBIAN_FRONTEND", "noninteractive")
 os.environ.setdefault("GIT_TERMINAL_PROMPT", "0")
 os.environ.setdefault("PIP_NO_INPUT", "1")
 
+# Built once; rebuilding {**os.environ, ...} per command is wasted work
+_CMD_ENV = {**os.environ, "TERM": "dumb"}
+
 
 def run_cmd(cmd: str, check: bool = True) -> tuple[int, str, str]:
     """Run a command non-interactively."""
@@ -22,7 +31,7 @@ def run_cmd(cmd: str, check: bool = True) -> tuple[int, str, str]:
         shell=True,
         capture_output=True,
         text=True,
-        env={**os.environ, "TERM": "dumb"},
+        env=_CMD_ENV,
         timeout=300,
     )
     return result.returncode, result.stdout, result.stderr
@@ -37,6 +46,16 @@ def main():
     print("Protocol files in current directory.")
     print()
 
+    # Wake on filesystem events instead of a fixed 1s sleep; the wait
+    # timeout below is the polling fallback when watchfiles is missing.
+    wake = threading.Event()
+    if watchfiles is not None:
+        def _watch():
+            for _ in watchfiles.watch(COMMANDS_FILE):
+                wake.set()
+
+        threading.Thread(target=_watch, daemon=True).start()
+
     # Main loop
     while True:
         # Check for commands
@@ -61,8 +80,9 @@ def main():
 
                 # Demo: pretend to work on task
                 handle_task(agent, task)
-
-        time.sleep(1)
+        else:
+            wake.wait(timeout=1.0 if watchfiles is None else 10.0)
+            wake.clear()
 
 
 def handle_task(agent: AgentProtocol, task: str):
@@ -17,6 +17,9 @@ Environment:
 """
 
 import argparse
+import collections
+import concurrent.futures
+import functools
 import json
 import os
 import sys
@@ -26,31 +29,29 @@ from typing import Optional
 
 import httpx
 
+# orjson parses the SSE payloads and GraphQL responses several times
+# faster than stdlib json; fall back when not installed.
+try:
+    from orjson import loads as _loads
+except ImportError:
+    _loads = json.loads
+
 LINEAR_API = "https://api.linear.app/graphql"
 LINEAR_API_KEY = os.environ.get("LINEAR_API_KEY", "")
 CLAUDE_SERVER = os.environ.get("CLAUDE_BOX_SERVER", "http://localhost:8080")
 TEAM_ID = os.environ.get("LINEAR_TEAM_ID", "")
 
 
-def linear_query(query: str, variables: dict = None) -> dict:
-    """Execute a Linear GraphQL query."""
-    response = httpx.post(
-        LINEAR_API,
-        json={"query": query, "variables": variables or {}},
-        headers={"Authorization": LINEAR_API_KEY},
-        timeout=30,
-    )
-    response.raise_for_status()
-    data = response.json()
-    if "errors" in data:
-        raise Exception(f"Linear API error: {data['errors']}")
-    return data.get("data", {})
+def _gql(query: str) -> str:
+    """Collapse a GraphQL literal to one line, once, at import time."""
+    return " ".join(query.split())
 
 
-def get_pending_issues(label: str = None, limit: int = 10) -> list[dict]:
-    """Fetch issues ready for Claude to work on."""
-    # Filter: Backlog or Todo state, optionally with specific label
-    query = """
+# All GraphQL documents the worker ever sends, compiled to compact
+# module constants: the whitespace stripping and string building happen
+# once per process instead of once per call, and every call sends the
+# same (smaller) bytes - which also makes the lru_cache key cheap.
+_PENDING_ISSUES_QUERY = _gql("""
     query PendingIssues($first: Int, $filter: IssueFilter) {
         issues(first: $first, filter: $filter, orderBy: priority) {
             nodes {
@@ -59,14 +60,104 @@ def get_pending_issues(label: str = None, limit: int = 10) -> list[dict]:
                 title
                 description
                 priority
+                updatedAt
                 state { name }
                 labels { nodes { name } }
                 url
             }
         }
     }
+""")
+
+_STATES_QUERY = _gql("""
+    query States($filter: WorkflowStateFilter) {
+        workflowStates(filter: $filter) {
+            nodes { id name }
+        }
+    }
+""")
+
+_UPDATE_ISSUE_MUTATION = _gql("""
+    mutation UpdateIssue($id: String!, $stateId: String!) {
+        issueUpdate(id: $id, input: { stateId: $stateId }) {
+            success
+        }
+    }
+""")
+
+_FINALIZE_MUTATION = _gql("""
+    mutation Finalize($id: String!, $stateId: String!, $body: String!) {
+        comment: commentCreate(input: { issueId: $id, body: $body }) {
+            success
+        }
+        state: issueUpdate(id: $id, input: { stateId: $stateId }) {
+            success
+        }
+    }
+""")
+
+_ADD_COMMENT_MUTATION = _gql("""
+    mutation AddComment($issueId: String!, $body: String!) {
+        commentCreate(input: { issueId: $issueId, body: $body }) {
+            success
+        }
+    }
+""")
+
+
+def _make_linear_client() -> httpx.Client:
+    """Pooled client for Linear: one TLS handshake per daemon run instead
+    of one per call, with HTTP/2 multiplexing when h2 is installed."""
+    kwargs = dict(
+        headers={"Authorization": LINEAR_API_KEY},
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_keepalive_connections=4),
+    )
+    try:
+        return httpx.Client(http2=True, **kwargs)
+    except ImportError:  # h2 not installed
+        return httpx.Client(**kwargs)
+
+
+_LINEAR_CLIENT = _make_linear_client()
+
+# Separate pooled client for the Claude box; HTTP/1.1 is fine for the
+# long-lived SSE stream
+_CLAUDE_CLIENT = httpx.Client(timeout=30)
+
+
+def linear_query(query: str, variables: dict = None, cacheable: bool = False) -> dict:
+    """Execute a Linear GraphQL query.
+
+    Pass cacheable=True for idempotent reads whose answer is stable for
+    the life of the process (e.g. workflow-state lookups) to skip the
+    round-trip on repeats.
     """
+    if cacheable:
+        return _cached_query(query, json.dumps(variables or {}, sort_keys=True))
+    return _post_query(query, variables or {})
 
+
+@functools.lru_cache(maxsize=64)
+def _cached_query(query: str, variables_json: str) -> dict:
+    return _post_query(query, json.loads(variables_json))
+
+
+def _post_query(query: str, variables: dict) -> dict:
+    response = _LINEAR_CLIENT.post(
+        LINEAR_API,
+        json={"query": query, "variables": variables},
+    )
+    response.raise_for_status()
+    data = _loads(response.content)
+    if "errors" in data:
+        raise Exception(f"Linear API error: {data['errors']}")
+    return data.get("data", {})
+
+
+def _build_pending_filter(label: str = None) -> dict:
+    """Filter for issues ready to work: Backlog or Todo state,
+    optionally restricted to a team and label."""
     filter_obj = {
         "state": {"type": {"in": ["backlog", "unstarted"]}},
     }
@@ -77,49 +168,72 @@ def get_pending_issues(label: str = None, limit: int = 10) -> list[dict]:
     if label:
         filter_obj["labels"] = {"name": {"eq": label}}
 
-    data = linear_query(query, {"first": limit, "filter": filter_obj})
-    return data.get("issues", {}).get("nodes", [])
+    return filter_obj
 
 
-def update_issue_state(issue_id: str, state_name: str):
-    """Update issue state (In Progress, Done, etc.)."""
-    # First, find the state ID
-    query = """
-    query States($filter: WorkflowStateFilter) {
-        workflowStates(filter: $filter) {
-            nodes { id name }
-        }
-    }
+def get_pending_issues(label: str = None, limit: int = 10,
+                       updated_after: str = None) -> list[dict]:
+    """Fetch issues ready for Claude to work on.
+
+    updated_after narrows the query to issues touched since that
+    timestamp, so an idle daemon tick gets an empty response back instead
+    of re-downloading the whole backlog slice.
     """
-    states = linear_query(query, {"filter": {"name": {"eq": state_name}}})
+    filter_obj = _build_pending_filter(label)
+
+    if updated_after:
+        filter_obj["updatedAt"] = {"gt": updated_after}
+
+    data = linear_query(_PENDING_ISSUES_QUERY, {"first": limit, "filter": filter_obj})
+    return data.get("issues", {}).get("nodes", [])
+
+
+# Workflow state ids never change within a run; look them up once
+# instead of a fresh round-trip per state change
+_state_id_cache: dict[str, str] = {}
+
+
+def get_state_id(state_name: str) -> Optional[str]:
+    """Resolve a workflow state name to its id, caching results."""
+    if state_name in _state_id_cache:
+        return _state_id_cache[state_name]
+
+    states = linear_query(_STATES_QUERY,
+                          {"filter": {"name": {"eq": state_name}}}, cacheable=True)
     state_nodes = states.get("workflowStates", {}).get("nodes", [])
 
     if not state_nodes:
+        return None
+
+    _state_id_cache[state_name] = state_nodes[0]["id"]
+    return _state_id_cache[state_name]
+
+
+def update_issue_state(issue_id: str, state_name: str):
+    """Update issue state (In Progress, Done, etc.)."""
+    state_id = get_state_id(state_name)
+    if state_id is None:
         print(f"Warning: State '{state_name}' not found")
         return
 
-    state_id = state_nodes[0]["id"]
+    linear_query(_UPDATE_ISSUE_MUTATION, {"id": issue_id, "stateId": state_id})
 
-    mutation = """
-    mutation UpdateIssue($id: String!, $stateId: String!) {
-        issueUpdate(id: $id, input: { stateId: $stateId }) {
-            success
-        }
-    }
-    """
-    linear_query(mutation, {"id": issue_id, "stateId": state_id})
+
+def finalize_issue(issue_id: str, comment_body: str, state_name: str):
+    """Post the result comment and set the final state in one round-trip."""
+    state_id = get_state_id(state_name)
+    if state_id is None:
+        print(f"Warning: State '{state_name}' not found")
+        add_comment(issue_id, comment_body)
+        return
+
+    linear_query(_FINALIZE_MUTATION,
+                 {"id": issue_id, "stateId": state_id, "body": comment_body})
 
 
 def add_comment(issue_id: str, body: str):
     """Add a comment to an issue."""
-    mutation = """
-    mutation AddComment($issueId: String!, $body: String!) {
-        commentCreate(input: { issueId: $issueId, body: $body }) {
-            success
-        }
-    }
-    """
-    linear_query(mutation, {"issueId": issue_id, "body": body})
+    linear_query(_ADD_COMMENT_MUTATION, {"issueId": issue_id, "body": body})
 
 
 def build_prompt(issue: dict) -> str:
@@ -140,6 +254,38 @@ If you cannot complete this task, explain why and what additional information yo
 """
 
 
+def _parse_sse_frame(frame: bytes) -> tuple[bytes, Optional[dict]]:
+    """Split one SSE frame into (event type, decoded data payload).
+
+    The server always emits "event: ...\\ndata: ...", so one partition
+    on the first newline replaces the per-line split/strip/startswith
+    dance. The event type stays bytes end to end - callers compare
+    against byte literals - so nothing is decoded except the JSON
+    payload itself (which _loads accepts as bytes).
+    """
+    head, _, rest = frame.partition(b"\n")
+    event_type = head[6:].strip() if head.startswith(b"event:") else b""
+    if rest.startswith(b"data:"):
+        try:
+            return event_type, _loads(rest[5:])
+        except json.JSONDecodeError:
+            pass
+    return event_type, None
+
+
+def _requeue_issue(issue: dict):
+    """Put an issue we marked In Progress but couldn't run back in Todo.
+
+    Without this a busy server (409) or a connection error strands the
+    issue In Progress - a started state the pending filter never
+    matches - with no comment and no retry.
+    """
+    try:
+        update_issue_state(issue["id"], "Todo")
+    except Exception as e:
+        print(f"Warning: Could not requeue {issue['identifier']}: {e}")
+
+
 def process_issue(issue: dict, dry_run: bool = False) -> bool:
     """Process a single issue with Claude."""
     print(f"\n{'='*60}")
@@ -161,58 +307,72 @@ def process_issue(issue: dict, dry_run: bool = False) -> bool:
     except Exception as e:
         print(f"Warning: Could not update state: {e}")
 
-    # Send to Claude
-    output_lines = []
+    # Send to Claude. Only the last 50 output lines are ever reported,
+    # so keep a bounded ring instead of accumulating the whole task.
+    output_lines = collections.deque(maxlen=50)
     success = False
 
     try:
-        with httpx.stream(
+        with _CLAUDE_CLIENT.stream(
             "POST",
             f"{CLAUDE_SERVER}/task",
             json={"prompt": prompt},
             timeout=None,
         ) as response:
             if response.status_code == 409:
+                # The server runs one task at a time; leave this issue
+                # in the queue for a later tick
                 print("Error: Claude is busy")
+                _requeue_issue(issue)
                 return False
 
             if response.status_code != 200:
                 print(f"Error: {response.status_code}")
+                _requeue_issue(issue)
                 return False
 
-            event_type = None
-            for line in response.iter_lines():
-                line = line.strip()
-
-                if line.startswith("event:"):
-                    event_type = line[6:].strip()
-                elif line.startswith("data:"):
-                    try:
-                        data = json.loads(line[5:].strip())
-                    except json.JSONDecodeError:
+            # Byte-level SSE framer: find blank-line event boundaries and
+            # parse each frame once, instead of iter_lines() plus a
+            # speculative second json.loads for every line
+            buf = bytearray()
+            for chunk in response.iter_bytes(chunk_size=64 * 1024):
+                buf += chunk
+                while (idx := buf.find(b"\n\n")) >= 0:
+                    event_type, data = _parse_sse_frame(bytes(buf[:idx]))
+                    del buf[:idx + 2]
+                    if data is None:
                         continue
 
-                    if event_type == "output":
-                        output_lines.append(data.get("line", ""))
-                        # Try to extract text for display
-                        try:
-                            parsed = json.loads(data.get("line", ""))
+                    if event_type == b"output":
+                        line_text = data.get("line", "")
+                        output_lines.append(line_text)
+                        # Extract text for display; stream-json lines
+                        # always start with '{'
+                        if line_text[:1] == "{":
+                            try:
+                                parsed = _loads(line_text)
+                            except json.JSONDecodeError:
+                                continue
                             if parsed.get("type") == "assistant":
-                                for block in parsed.get("message", {}).get("content", []):
+                                wrote = False
+                                for block in parsed.get("message", {}).get("content", ()):
                                     if block.get("type") == "text":
-                                        print(block.get("text", ""), end="", flush=True)
-                        except:
-                            pass
+                                        sys.stdout.write(block.get("text", ""))
+                                        wrote = True
+                                if wrote:
+                                    sys.stdout.flush()
 
-                    elif event_type == "done":
+                    elif event_type == b"done":
                         success = data.get("exit_code") == 0
                         print(f"\n[{'SUCCESS' if success else 'FAILED'}]")
 
     except Exception as e:
         print(f"Error communicating with Claude: {e}")
+        _requeue_issue(issue)
         return False
 
     # Build result comment
+    output_text = "\n".join(output_lines)
     result_comment = f"""## Claude's Analysis
 
 **Status:** {'Completed' if success else 'Failed/Needs Review'}
@@ -221,51 +381,106 @@ def process_issue(issue: dict, dry_run: bool = False) -> bool:
 ### Output Summary
 
 ```
-{chr(10).join(output_lines[-50:])}
+{output_text}
 ```
 
 ---
 *Processed by Claude-in-a-Box*
 """
 
-    # Post comment and update state
+    # Post comment and update state in a single round-trip
     try:
-        add_comment(issue["id"], result_comment)
-
-        if success:
-            update_issue_state(issue["id"], "In Review")
-        else:
-            update_issue_state(issue["id"], "Todo")  # Back to queue
+        finalize_issue(
+            issue["id"],
+            result_comment,
+            "In Review" if success else "Todo",  # failed goes back to queue
+        )
     except Exception as e:
         print(f"Warning: Could not update Linear: {e}")
 
     return success
 
 
-def daemon_loop(label: str = None, interval: int = 60):
-    """Keep running and process issues as they appear."""
+def daemon_loop(label: str = None, interval: int = 60, concurrency: int = 1):
+    """Keep running and process issues as they appear.
+
+    With concurrency > 1, up to that many issues are processed in
+    parallel worker threads. process_issue is blocking network I/O end
+    to end, so the threads genuinely overlap: one can wait on Claude's
+    SSE stream while others talk to Linear. Ctrl+C then drains: tasks
+    already running in worker threads finish before the daemon exits,
+    because there is no safe way to abort them mid-stream. At the
+    default concurrency of 1 no pool is involved and Ctrl+C aborts the
+    in-flight task immediately, as it always has.
+    """
     print(f"Starting daemon mode (poll every {interval}s)")
     print(f"Label filter: {label or 'none'}")
+    if concurrency > 1:
+        print(f"Concurrency: {concurrency}")
     print("Press Ctrl+C to stop")
 
-    while True:
-        try:
-            issues = get_pending_issues(label=label, limit=1)
-
-            if issues:
-                issue = issues[0]
-                process_issue(issue)
-            else:
-                print(f"[{datetime.now().strftime('%H:%M:%S')}] No pending issues")
-
-            time.sleep(interval)
-
-        except KeyboardInterrupt:
-            print("\nStopping daemon")
-            break
-        except Exception as e:
-            print(f"Error: {e}")
-            time.sleep(interval)
+    # Only ask for issues updated since the newest one we've seen, so
+    # idle ticks come back as empty (near-zero-byte) responses. The
+    # watermark is an idle-tick shortcut, not a cursor: an empty
+    # filtered tick falls back to an unfiltered query below, because
+    # pending issues older than the watermark are still pending.
+    last_watermark = None
+
+    # The query's variables never change between ticks except the
+    # updatedAt watermark, so build the filter once and patch that one
+    # key instead of rebuilding the dict every interval
+    filter_obj = _build_pending_filter(label)
+    variables = {"first": concurrency, "filter": filter_obj}
+
+    # Only spin up worker threads when they can actually overlap work:
+    # routing the single-issue case through a pool would turn Ctrl+C
+    # into a blocking join on the in-flight task.
+    pool = (concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+            if concurrency > 1 else None)
+    try:
+        while True:
+            try:
+                if last_watermark:
+                    filter_obj["updatedAt"] = {"gt": last_watermark}
+                data = linear_query(_PENDING_ISSUES_QUERY, variables)
+                issues = data.get("issues", {}).get("nodes", [])
+
+                if not issues and last_watermark:
+                    # Nothing updated lately, but older issues may still
+                    # be waiting; re-check without the watermark so the
+                    # shortcut can't starve the backlog
+                    last_watermark = None
+                    del filter_obj["updatedAt"]
+                    data = linear_query(_PENDING_ISSUES_QUERY, variables)
+                    issues = data.get("issues", {}).get("nodes", [])
+
+                if issues:
+                    for issue in issues:
+                        if issue.get("updatedAt"):
+                            last_watermark = max(last_watermark or "",
+                                                 issue["updatedAt"])
+                    if pool is None:
+                        for issue in issues:
+                            process_issue(issue)
+                    else:
+                        futures = [pool.submit(process_issue, issue)
+                                   for issue in issues]
+                        for future in futures:
+                            future.result()
+                else:
+                    print(f"[{datetime.now().strftime('%H:%M:%S')}] No pending issues")
+
+                time.sleep(interval)
+
+            except KeyboardInterrupt:
+                print("\nStopping daemon")
+                break
+            except Exception as e:
+                print(f"Error: {e}")
+                time.sleep(interval)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
 
 
 def main():
@@ -275,6 +490,8 @@ def main():
     parser.add_argument("--label", "-l", help="Only process issues with this label")
     parser.add_argument("--interval", "-i", type=int, default=60, help="Daemon poll interval (seconds)")
     parser.add_argument("--limit", "-n", type=int, default=5, help="Max issues to show/process")
+    parser.add_argument("--concurrency", "-c", type=int, default=1,
+                        help="Issues to process in parallel (daemon mode)")
     args = parser.parse_args()
 
     if not LINEAR_API_KEY:
@@ -283,7 +500,8 @@ def main():
         sys.exit(1)
 
     if args.daemon:
-        daemon_loop(label=args.label, interval=args.interval)
+        daemon_loop(label=args.label, interval=args.interval,
+                    concurrency=args.concurrency)
     else:
         issues = get_pending_issues(label=args.label, limit=args.limit)
 
@@ -291,10 +509,13 @@ def main():
             print("No pending issues found")
             return
 
-        print(f"Found {len(issues)} pending issues:")
-        for issue in issues:
-            labels = [l["name"] for l in issue.get("labels", {}).get("nodes", [])]
-            print(f"  {issue['identifier']}: {issue['title'][:50]} [{', '.join(labels)}]")
+        # One syscall for the whole listing; join consumes generators
+        # directly, no intermediate label lists
+        print(f"Found {len(issues)} pending issues:\n" + "\n".join(
+            f"  {issue['identifier']}: {issue['title'][:50]} "
+            f"[{', '.join(l['name'] for l in issue.get('labels', {}).get('nodes', ()))}]"
+            for issue in issues
+        ))
 
         if args.dry_run:
             print("\n[DRY RUN] Would process first issue")
@@ -4,15 +4,36 @@ Agent Control Protocol - Core module
 File-based communication between agent and human controller.
 """
 
+import atexit
 import json
 import time
+import threading
 import uuid
 import os
 from pathlib import Path
-from dataclasses import dataclass, asdict
 from typing import Optional, Literal
 from datetime import datetime
 
+try:
+    import watchfiles
+except ImportError:
+    watchfiles = None
+
+# orjson en/decodes the protocol's JSONL records several times faster
+# than stdlib json and works in bytes directly; fall back when missing.
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
 # Protocol directory (configurable via env)
 PROTOCOL_DIR = Path(os.environ.get("AGENT_PROTOCOL_DIR", "."))
 
@@ -22,45 +43,104 @@ REQUESTS_FILE = PROTOCOL_DIR / "requests.jsonl"
 RESPONSES_FILE = PROTOCOL_DIR / "responses.jsonl"
 LOG_FILE = PROTOCOL_DIR / "log.jsonl"
 COMMANDS_FILE = PROTOCOL_DIR / "commands.jsonl"
+# Byte offset into COMMANDS_FILE of the first unprocessed command;
+# persisting it means a restarted agent doesn't replay old commands
+COMMANDS_OFFSET_FILE = PROTOCOL_DIR / ".commands.offset"
 
 # Polling config
 POLL_INTERVAL = float(os.environ.get("AGENT_POLL_INTERVAL", "1.0"))
 POLL_TIMEOUT = float(os.environ.get("AGENT_POLL_TIMEOUT", "3600"))  # 1 hour default
 
+# Rapid status transitions (e.g. inside request_input) are coalesced
+# into one write per debounce window
+STATUS_DEBOUNCE = 0.05
+
+
+class _JsonlAppender:
+    """Long-lived append-mode files for JSONL records.
+
+    Re-opening the file per record cost an open/fstat/write/close per log
+    line. Here each path is opened once, unbuffered, so a record is a
+    single O_APPEND write(2) - immediately visible to other processes and
+    atomic against concurrent writers.
+    """
+
+    def __init__(self):
+        self._files = {}
+        atexit.register(self.close_all)
+
+    def append(self, path: Path, data: dict):
+        f = self._files.get(path)
+        if f is None:
+            f = self._files[path] = open(path, "ab", buffering=0)
+        f.write(_dumps(data) + b"\n")
+
+    def close_all(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+
+_appender = _JsonlAppender()
+
 
 def _append_jsonl(path: Path, data: dict):
     """Append a JSON record to a JSONL file."""
-    with open(path, "a") as f:
-        f.write(json.dumps(data) + "\n")
+    _appender.append(path, data)
+
+
+# Incremental tail cache: per path, (inode, byte offset, parsed records).
+# Poll loops call _read_jsonl once a second on ever-growing files, so only
+# bytes appended since the previous call are parsed; the record list is
+# extended in place. Rotation/truncation resets the cache for that path.
+_tail_cache: dict = {}
 
 
 def _read_jsonl(path: Path) -> list[dict]:
-    """Read all records from a JSONL file."""
-    if not path.exists():
+    """Read all records from a JSONL file (incrementally tailed)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        _tail_cache.pop(path, None)
         return []
-    records = []
-    with open(path) as f:
-        for line in f:
+
+    ino, offset, records = _tail_cache.get(path, (None, 0, []))
+    if ino is None or st.st_ino != ino or st.st_size < offset:
+        offset, records = 0, []
+
+    if st.st_size > offset:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Parse only complete lines; a partial line mid-append by another
+        # process is picked up on the next call.
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].split(b"\n"):
             line = line.strip()
             if line:
-                records.append(json.loads(line))
+                records.append(_loads(line))
+        offset += end
+
+    _tail_cache[path] = (st.st_ino, offset, records)
     return records
 
 
 def _write_json(path: Path, data: dict):
     """Write JSON to file atomically."""
     tmp = path.with_suffix(".tmp")
-    with open(tmp, "w") as f:
-        json.dump(data, f, indent=2)
-    tmp.rename(path)
+    with open(tmp, "wb") as f:
+        # No indent: set_status rewrites this on every transition and
+        # pretty-printing doubles both format cost and bytes written
+        f.write(_dumps(data))
+    # os.replace for explicit atomic-replace semantics on POSIX and Windows
+    os.replace(tmp, path)
 
 
 def _read_json(path: Path) -> Optional[dict]:
     """Read JSON file if it exists."""
     if not path.exists():
         return None
-    with open(path) as f:
-        return json.load(f)
+    return _loads(path.read_bytes())
 
 
 # === Agent-side API ===
@@ -71,14 +151,42 @@ class AgentProtocol:
     def __init__(self, agent_id: str = None):
         self.agent_id = agent_id or f"agent_{uuid.uuid4().hex[:8]}"
         self._request_counter = 0
-        self._processed_commands = set()
+        self._commands_offset = self._load_commands_offset()
+        # Responses indexed by request id; filled incrementally so each
+        # poll is an O(1) lookup instead of a scan over all history
+        self._response_index: dict = {}
+        self._responses_seen = 0
+        # Debounced status writes: only the newest status in a burst
+        # reaches disk, via a single trailing timer
+        self._status_lock = threading.Lock()
+        self._pending_status = None
+        self._status_timer = None
         self._init_files()
+        # Wake the poll loop on filesystem events instead of burning the
+        # full POLL_INTERVAL; the timed wait stays as a fallback.
+        self._wake = threading.Event()
+        if watchfiles is not None:
+            threading.Thread(target=self._watch_files, daemon=True).start()
+
+    def _watch_files(self):
+        for _ in watchfiles.watch(RESPONSES_FILE, COMMANDS_FILE):
+            self._wake.set()
 
     def _init_files(self):
-        """Ensure protocol files exist."""
-        PROTOCOL_DIR.mkdir(parents=True, exist_ok=True)
+        """Ensure protocol files exist.
+
+        One scandir tells us what's already there; touch() only the
+        missing files instead of four unconditional open/close round
+        trips on every agent start.
+        """
+        try:
+            existing = {entry.name for entry in os.scandir(PROTOCOL_DIR)}
+        except FileNotFoundError:
+            PROTOCOL_DIR.mkdir(parents=True, exist_ok=True)
+            existing = set()
         for f in [REQUESTS_FILE, RESPONSES_FILE, LOG_FILE, COMMANDS_FILE]:
-            f.touch()
+            if f.name not in existing:
+                f.touch()
         self.set_status("idle")
 
     def _next_request_id(self) -> str:
@@ -86,14 +194,34 @@ class AgentProtocol:
         return f"req_{self.agent_id}_{self._request_counter:04d}"
 
     def set_status(self, state: str, task: str = None, detail: str = None):
-        """Update agent status."""
-        _write_json(STATUS_FILE, {
+        """Update agent status.
+
+        Writes are debounced: the status is recorded immediately but
+        flushed to disk at most once per STATUS_DEBOUNCE window, so the
+        transient flip-flops inside request_input cost one write, not
+        several. The timer thread is non-daemon, so the trailing write
+        always lands before interpreter exit.
+        """
+        status = {
             "agent_id": self.agent_id,
             "state": state,
             "task": task,
             "detail": detail,
             "updated_at": datetime.now().isoformat(),
-        })
+        }
+        with self._status_lock:
+            self._pending_status = status
+            if self._status_timer is None:
+                self._status_timer = threading.Timer(
+                    STATUS_DEBOUNCE, self._flush_status)
+                self._status_timer.start()
+
+    def _flush_status(self):
+        with self._status_lock:
+            status, self._pending_status = self._pending_status, None
+            self._status_timer = None
+        if status is not None:
+            _write_json(STATUS_FILE, status)
 
     def log(self, level: str, message: str, **extra):
         """Write to activity log."""
@@ -105,6 +233,16 @@ class AgentProtocol:
             **extra,
         })
 
+    def _refresh_responses(self):
+        """Index any responses that arrived since the last refresh."""
+        responses = _read_jsonl(RESPONSES_FILE)
+        for resp in responses[self._responses_seen:]:
+            rid = resp.get("id")
+            if rid:
+                # Keep the first response per id, matching the old scan order
+                self._response_index.setdefault(rid, resp)
+        self._responses_seen = len(responses)
+
     def request_input(
         self,
         prompt: str,
@@ -136,12 +274,15 @@ class AgentProtocol:
         # Poll for response
         start = time.time()
         while time.time() - start < POLL_TIMEOUT:
-            responses = _read_jsonl(RESPONSES_FILE)
-            for resp in responses:
-                if resp.get("id") == req_id:
-                    self.log("info", f"Got response: {resp.get('answer')}", request_id=req_id)
-                    return resp.get("answer", default)
-            time.sleep(POLL_INTERVAL)
+            self._refresh_responses()
+            resp = self._response_index.get(req_id)
+            if resp is not None:
+                self.log("info", f"Got response: {resp.get('answer')}", request_id=req_id)
+                return resp.get("answer", default)
+            # Event-driven: returns as soon as the watcher sees a write
+            # to the responses file, or after the timeout as a safety net
+            self._wake.wait(POLL_INTERVAL if watchfiles is None else 10 * POLL_INTERVAL)
+            self._wake.clear()
 
         # Timeout - use default or raise
         if default is not None:
@@ -172,15 +313,50 @@ class AgentProtocol:
         """Ask for free-form input."""
         return self.request_input(prompt, request_type="input", default=default)
 
+    @staticmethod
+    def _load_commands_offset() -> int:
+        try:
+            return int(COMMANDS_OFFSET_FILE.read_text() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
     def check_commands(self) -> Optional[dict]:
-        """Check for new commands from controller."""
-        commands = _read_jsonl(COMMANDS_FILE)
-        for cmd in commands:
-            cmd_id = cmd.get("id")
-            if cmd_id and cmd_id not in self._processed_commands:
-                self._processed_commands.add(cmd_id)
-                return cmd
-        return None
+        """Check for new commands from controller.
+
+        Tracks a byte offset into the commands file instead of re-reading
+        the whole history and filtering against a processed-id set; each
+        check only ever touches bytes appended since the last one. The
+        offset is persisted so restarts don't replay old commands.
+        """
+        try:
+            st = os.stat(COMMANDS_FILE)
+        except FileNotFoundError:
+            return None
+
+        if st.st_size < self._commands_offset:
+            # Truncated/rotated; start over
+            self._commands_offset = 0
+        if st.st_size == self._commands_offset:
+            return None
+
+        with open(COMMANDS_FILE, "rb") as f:
+            f.seek(self._commands_offset)
+            data = f.read()
+
+        # Consume complete lines until the first non-blank one; a partial
+        # line mid-append is left for the next call
+        cmd = None
+        pos = 0
+        while cmd is None and (nl := data.find(b"\n", pos)) >= 0:
+            line = data[pos:nl].strip()
+            pos = nl + 1
+            if line:
+                cmd = _loads(line)
+
+        if pos:
+            self._commands_offset += pos
+            COMMANDS_OFFSET_FILE.write_text(str(self._commands_offset))
+        return cmd
 
 
 # === Controller-side API ===
@@ -189,8 +365,16 @@ class ControllerProtocol:
     """Human controller-side protocol handler."""
 
     def __init__(self):
-        PROTOCOL_DIR.mkdir(parents=True, exist_ok=True)
+        if not PROTOCOL_DIR.is_dir():
+            PROTOCOL_DIR.mkdir(parents=True, exist_ok=True)
         self._command_counter = 0
+        # Requests and responses indexed by id, filled incrementally from
+        # the tailing reader; pending checks then test dict membership
+        # instead of rebuilding an answered-id set from all history
+        self._requests_by_id: dict[str, dict] = {}
+        self._responses_by_id: dict[str, dict] = {}
+        self._requests_seen = 0
+        self._responses_seen = 0
 
     def _next_command_id(self) -> str:
         self._command_counter += 1
@@ -200,12 +384,29 @@ class ControllerProtocol:
         """Get current agent status."""
         return _read_json(STATUS_FILE)
 
-    def get_pending_requests(self) -> list[dict]:
-        """Get requests that haven't been answered."""
+    def _refresh_indexes(self):
+        """Index records that arrived since the last refresh."""
         requests = _read_jsonl(REQUESTS_FILE)
+        for req in requests[self._requests_seen:]:
+            rid = req.get("id")
+            if rid:
+                self._requests_by_id.setdefault(rid, req)
+        self._requests_seen = len(requests)
+
         responses = _read_jsonl(RESPONSES_FILE)
-        answered_ids = {r.get("id") for r in responses}
-        return [r for r in requests if r.get("id") not in answered_ids]
+        for resp in responses[self._responses_seen:]:
+            rid = resp.get("id")
+            if rid:
+                self._responses_by_id.setdefault(rid, resp)
+        self._responses_seen = len(responses)
+
+    def get_pending_requests(self) -> list[dict]:
+        """Get requests that haven't been answered."""
+        self._refresh_indexes()
+        # Dict insertion order matches file order, so this preserves the
+        # old first-to-last ordering without a per-call answered-id set
+        return [req for rid, req in self._requests_by_id.items()
+                if rid not in self._responses_by_id]
 
     def respond(self, request_id: str, answer: str):
         """Send response to a request."""
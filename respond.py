@@ -112,6 +112,61 @@ def send_task(ctrl: ControllerProtocol, task: str):
     print(f"Sent task (cmd_id={cmd_id}): {task}")
 
 
+def watch_mode(ctrl: ControllerProtocol):
+    """Live dashboard over the protocol files.
+
+    Redraws only when a protocol file actually changes (filesystem
+    events via watchfiles, 2s polling as the fallback), and repaints in
+    place with a home-cursor escape instead of a full screen clear, so
+    an unchanged dashboard doesn't flicker blank every tick.
+    """
+    import io
+    import time
+    from contextlib import redirect_stdout
+    from protocol import PROTOCOL_DIR
+
+    try:
+        import watchfiles
+    except ImportError:
+        watchfiles = None
+
+    def render() -> str:
+        out = io.StringIO()
+        with redirect_stdout(out):
+            print("=== Status ===")
+            show_status(ctrl)
+            print("\n=== Pending Requests ===")
+            show_pending(ctrl)
+            print("\n=== Recent Log ===")
+            show_log(ctrl, 10)
+        return out.getvalue()
+
+    last_frame = None
+
+    def draw():
+        nonlocal last_frame
+        frame = render()
+        if frame != last_frame:
+            # Home the cursor, write the frame, erase whatever the
+            # previous (possibly longer) frame left below it
+            sys.stdout.write("\033[H" + frame + "\033[J")
+            sys.stdout.flush()
+            last_frame = frame
+
+    sys.stdout.write("\033[2J")  # clear once on entry; never again
+    draw()
+
+    if watchfiles is not None:
+        # yield_on_timeout keeps a 2s heartbeat redraw as a safety net
+        for _ in watchfiles.watch(PROTOCOL_DIR, rust_timeout=2_000,
+                                  yield_on_timeout=True):
+            draw()
+    else:
+        while True:
+            time.sleep(2)
+            draw()
+
+
 def main():
     ctrl = ControllerProtocol()
 
@@ -147,17 +202,7 @@ def main():
         print("Sent abort command")
 
     elif cmd == "watch":
-        # Simple watch mode
-        import time
-        while True:
-            print("\033[2J\033[H")  # Clear screen
-            print("=== Status ===")
-            show_status(ctrl)
-            print("\n=== Pending Requests ===")
-            show_pending(ctrl)
-            print("\n=== Recent Log ===")
-            show_log(ctrl, 10)
-            time.sleep(2)
+        watch_mode(ctrl)
 
     else:
         print(f"Unknown command: {cmd}")
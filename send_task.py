@@ -20,6 +20,22 @@ PROTOCOL_DIR = Path(os.environ.get("AGENT_PROTOCOL_DIR", "."))
 COMMANDS_FILE = PROTOCOL_DIR / "commands.jsonl"
 
 
+def _append_command(command: dict):
+    """Append one command as a single O_APPEND write(2).
+
+    Text-mode appends can split one record across several write
+    syscalls; with concurrent senders that risks interleaved JSONL
+    lines. A lone O_APPEND write of a record under PIPE_BUF is atomic
+    on POSIX, so parallel send_task invocations can't corrupt the file.
+    """
+    payload = json.dumps(command).encode() + b"\n"
+    fd = os.open(str(COMMANDS_FILE), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+
 def send_task(task: str, workdir: str = None) -> str:
     """Send a task and return the command ID."""
     cmd_id = f"cmd_{uuid.uuid4().hex[:8]}"
@@ -34,8 +50,7 @@ def send_task(task: str, workdir: str = None) -> str:
         command["workdir"] = workdir
 
     COMMANDS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(COMMANDS_FILE, "a") as f:
-        f.write(json.dumps(command) + "\n")
+    _append_command(command)
 
     return cmd_id
 
@@ -50,8 +65,7 @@ def main():
 
     if args.abort:
         cmd_id = f"cmd_{uuid.uuid4().hex[:8]}"
-        with open(COMMANDS_FILE, "a") as f:
-            f.write(json.dumps({"id": cmd_id, "type": "abort"}) + "\n")
+        _append_command({"id": cmd_id, "type": "abort"})
         print(f"Sent abort command: {cmd_id}")
         return
 
@@ -13,25 +13,89 @@ Endpoints:
 """
 
 import asyncio
+import itertools
 import json
 import os
+import re
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX
+    fcntl = None
 import sys
 import uuid
 import subprocess
+from collections import deque
 from datetime import datetime
 from typing import AsyncGenerator, Optional
-from dataclasses import dataclass, asdict, field
+from dataclasses import dataclass, field
 
 from aiohttp import web
 
+# uvloop swaps the selectors-based event loop for libuv's C
+# implementation; the server is pure I/O multiplexing, so the whole
+# read-chunk/write-SSE inner loop benefits. Optional.
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# orjson encodes the per-line SSE payloads several times faster than
+# stdlib json and emits bytes directly; fall back when missing.
+try:
+    from orjson import dumps as _dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
 # Config
 HOST = os.environ.get("AGENT_HOST", "0.0.0.0")
 PORT = int(os.environ.get("AGENT_PORT", "8080"))
 WORKSPACE = os.environ.get("WORKSPACE_DIR", "/workspace")
 MAX_HISTORY = 100
-
-
-@dataclass
+# StreamReader buffer limit for the claude subprocess; stream-json can
+# emit very large single lines (embedded file contents), and readline()
+# raises past the 64 KiB default
+READER_LIMIT = int(os.environ.get("AGENT_READER_LIMIT", str(4 * 1024 * 1024)))
+# Per-read size for Claude's stdout; one read can carry a whole burst
+CHUNK_SIZE = int(os.environ.get("AGENT_CHUNK_SIZE", "65536"))
+
+# Matches one complete line; finditer runs the newline scan for an
+# entire chunk in C instead of a Python-level loop per line
+_LINE_RE = re.compile(rb"([^\n]*)\n")
+
+# Frame prefixes for every event type the server emits, built once so
+# the per-line hot path is a single bytes concatenation
+_EVENT_PREFIXES = {
+    name: f"event: {name}\ndata: ".encode()
+    for name in ("start", "output", "done", "error", "cancelled")
+}
+# Only the most recent output lines are kept per task; status/history
+# responses and memory stay bounded no matter how chatty a task is
+MAX_OUTPUT_LINES = int(os.environ.get("AGENT_MAX_OUTPUT_LINES", "2000"))
+# Seconds of stream silence before an SSE comment heartbeat goes out;
+# real output frames already keep the connection alive
+HEARTBEAT_INTERVAL = float(os.environ.get("AGENT_HEARTBEAT_INTERVAL", "1.0"))
+
+# Environment for claude subprocesses, merged once at import instead of
+# copying os.environ on every task submission
+_BASE_ENV = {
+    **os.environ,
+    "TERM": "dumb",
+    "NO_COLOR": "1",
+    "DEBIAN_FRONTEND": "noninteractive",
+    "GIT_TERMINAL_PROMPT": "0",
+    "PIP_NO_INPUT": "1",
+}
+
+
+def _now_iso() -> str:
+    """Task timestamp; second granularity is plenty for start/finish
+    markers and skips formatting six microsecond digits."""
+    return datetime.now().isoformat(timespec="seconds")
+
+
+@dataclass(slots=True)
 class TaskStatus:
     id: str
     state: str  # pending, running, completed, failed, cancelled
@@ -39,9 +103,25 @@ class TaskStatus:
     started_at: Optional[str] = None
     finished_at: Optional[str] = None
     exit_code: Optional[int] = None
-    output_lines: list[str] = field(default_factory=list)
+    output_lines: deque = field(
+        default_factory=lambda: deque(maxlen=MAX_OUTPUT_LINES))
     error: Optional[str] = None
 
+    def to_dict(self) -> dict:
+        """Flat dict for JSON responses. Direct attribute reads instead
+        of asdict's reflective field walk and deep copies; the output
+        ring is materialized to a list exactly once."""
+        return {
+            "id": self.id,
+            "state": self.state,
+            "prompt": self.prompt,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "exit_code": self.exit_code,
+            "output_lines": list(self.output_lines),
+            "error": self.error,
+        }
+
 
 class ClaudeAgent:
     """Manages Claude Code process and streaming output."""
@@ -49,13 +129,15 @@ class ClaudeAgent:
     def __init__(self):
         self.current_task: Optional[TaskStatus] = None
         self.process: Optional[asyncio.subprocess.Process] = None
-        self.history: list[TaskStatus] = []
+        # Bounded ring: append drops the oldest entry itself, no
+        # slice-and-copy trim on every task completion
+        self.history: deque[TaskStatus] = deque(maxlen=MAX_HISTORY)
         self._cancel_requested = False
 
     @property
     def status(self) -> dict:
         if self.current_task:
-            return asdict(self.current_task)
+            return self.current_task.to_dict()
         return {"state": "idle"}
 
     async def run_task(self, prompt: str, workdir: str = None) -> AsyncGenerator[str, None]:
@@ -67,7 +149,7 @@ class ClaudeAgent:
             id=task_id,
             state="running",
             prompt=prompt,
-            started_at=datetime.now().isoformat(),
+            started_at=_now_iso(),
         )
         self._cancel_requested = False
 
@@ -80,15 +162,6 @@ class ClaudeAgent:
             "--output-format", "stream-json",
         ]
 
-        env = {
-            **os.environ,
-            "TERM": "dumb",
-            "NO_COLOR": "1",
-            "DEBIAN_FRONTEND": "noninteractive",
-            "GIT_TERMINAL_PROMPT": "0",
-            "PIP_NO_INPUT": "1",
-        }
-
         try:
             self.process = await asyncio.create_subprocess_exec(
                 *cmd,
@@ -96,52 +169,97 @@ class ClaudeAgent:
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.STDOUT,
                 cwd=workdir or WORKSPACE,
-                env=env,
+                env=_BASE_ENV,
+                limit=READER_LIMIT,
             )
 
-            # Send prompt
-            self.process.stdin.write(prompt.encode() + b"\n")
-            await self.process.stdin.drain()
+            # Grow the kernel pipe behind stdout to 1 MiB so a bursting
+            # child isn't stalled on a full default-sized pipe between
+            # our reads. Best-effort: needs Linux F_SETPIPE_SZ and may
+            # be refused past /proc/sys/fs/pipe-max-size.
+            if fcntl is not None and hasattr(fcntl, "F_SETPIPE_SZ"):
+                try:
+                    transport = self.process._transport.get_pipe_transport(1)
+                    pipe_fd = transport.get_extra_info("pipe").fileno()
+                    fcntl.fcntl(pipe_fd, fcntl.F_SETPIPE_SZ, 1 << 20)
+                except (AttributeError, OSError, ValueError):
+                    pass
+
+            # Send prompt. A prompt under PIPE_BUF (4096) fits the pipe
+            # buffer in one atomic kernel write, so skip the drain
+            # round-trip and close immediately; larger prompts keep the
+            # drain for flow control.
+            data = prompt.encode() + b"\n"
+            self.process.stdin.write(data)
+            if len(data) > 4096:
+                await self.process.stdin.drain()
             self.process.stdin.close()
 
-            # Stream output
-            buffer = ""
+            # Stream output in large chunks and split them into lines
+            # with one C-level regex scan per chunk: readline-per-line
+            # cost a task switch per output line, while finditer hands
+            # back every complete line of a burst in a single pass. The
+            # read task is kept alive across heartbeat timeouts:
+            # asyncio.wait leaves it pending instead of the
+            # cancel-and-recreate cycle wait_for would impose on every
+            # quiet second.
+            # One bytearray reused for the whole task: extend() appends
+            # in place with amortized O(1) resizing and del drops the
+            # consumed prefix, so no fresh buffer object per chunk
+            buffer = bytearray()
+            read_task = None
+            loop = asyncio.get_running_loop()
+            last_yield = loop.time()
             while True:
                 if self._cancel_requested:
+                    if read_task is not None:
+                        read_task.cancel()
                     self.process.terminate()
                     yield self._sse_event("cancelled", {"task_id": task_id})
                     self.current_task.state = "cancelled"
                     break
 
-                try:
-                    chunk = await asyncio.wait_for(
-                        self.process.stdout.read(1024),
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
-                    # Send heartbeat to keep connection alive
-                    yield ": heartbeat\n\n"
+                if read_task is None:
+                    read_task = asyncio.ensure_future(
+                        self.process.stdout.read(CHUNK_SIZE))
+                done, _ = await asyncio.wait({read_task}, timeout=1.0)
+                if not done:
+                    # Heartbeat only after real silence; skip it when an
+                    # output frame went out recently enough
+                    now = loop.time()
+                    if now - last_yield >= HEARTBEAT_INTERVAL:
+                        yield b": heartbeat\n\n"
+                        last_yield = now
                     continue
 
+                chunk = read_task.result()
+                read_task = None
                 if not chunk:
+                    # EOF: flush a final unterminated line, if any
+                    if buffer.strip():
+                        line = buffer.decode("utf-8", errors="replace")
+                        self.current_task.output_lines.append(line)
+                        yield self._sse_event("output", {"line": line})
                     break
 
-                text = chunk.decode("utf-8", errors="replace")
-                buffer += text
-
-                # Process complete lines
-                while "\n" in buffer:
-                    line, buffer = buffer.split("\n", 1)
+                buffer.extend(chunk)
+                pos = 0
+                for m in _LINE_RE.finditer(buffer):
+                    pos = m.end()
+                    line = m.group(1).decode("utf-8", errors="replace")
                     if line.strip():
                         self.current_task.output_lines.append(line)
                         yield self._sse_event("output", {"line": line})
+                if pos:
+                    del buffer[:pos]
+                    last_yield = loop.time()
 
             # Wait for process to finish
             await self.process.wait()
             exit_code = self.process.returncode
 
             self.current_task.exit_code = exit_code
-            self.current_task.finished_at = datetime.now().isoformat()
+            self.current_task.finished_at = _now_iso()
 
             if self.current_task.state != "cancelled":
                 self.current_task.state = "completed" if exit_code == 0 else "failed"
@@ -155,14 +273,12 @@ class ClaudeAgent:
         except Exception as e:
             self.current_task.state = "failed"
             self.current_task.error = str(e)
-            self.current_task.finished_at = datetime.now().isoformat()
+            self.current_task.finished_at = _now_iso()
             yield self._sse_event("error", {"error": str(e)})
 
         finally:
-            # Save to history
+            # Save to history; the deque's maxlen does the trimming
             self.history.append(self.current_task)
-            if len(self.history) > MAX_HISTORY:
-                self.history = self.history[-MAX_HISTORY:]
             self.current_task = None
             self.process = None
 
@@ -173,9 +289,12 @@ class ClaudeAgent:
             return True
         return False
 
-    def _sse_event(self, event: str, data: dict) -> str:
-        """Format an SSE event."""
-        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    def _sse_event(self, event: str, data: dict) -> bytes:
+        """Format an SSE event, ready to write to the socket."""
+        prefix = _EVENT_PREFIXES.get(event)
+        if prefix is None:  # unknown event type; cold path
+            prefix = f"event: {event}\ndata: ".encode()
+        return prefix + _dumps(data) + b"\n\n"
 
 
 # Global agent instance
@@ -215,26 +334,86 @@ async def handle_task(request: web.Request) -> web.StreamResponse:
     )
     await response.prepare(request)
 
-    # Stream task output
+    # Stream task output. A bounded queue decouples the task generator
+    # from the socket, and the writer folds every event that is already
+    # queued into one write() - a single syscall per burst instead of a
+    # write+drain round-trip per output line. None marks end of stream.
+    queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    async def produce():
+        try:
+            async for event in agent.run_task(prompt, workdir):
+                await queue.put(event)
+        finally:
+            # Never block here: if we were cancelled while the queue was
+            # full (stalled client, then disconnect), an awaited put would
+            # hang this task forever - nothing is consuming anymore. A
+            # full queue already guarantees the writer wakes up; the
+            # sentinel only matters when there is room for it.
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+    producer = asyncio.ensure_future(produce())
     try:
-        async for event in agent.run_task(prompt, workdir):
-            await response.write(event.encode())
-            await response.drain()
+        done = False
+        while not done:
+            if queue.empty() and producer.done():
+                # The sentinel is dropped when the queue is full, so a
+                # finished producer plus an empty queue is end of stream
+                break
+            event = await queue.get()
+            if event is None:
+                break
+            buf = bytearray(event)
+            while len(buf) < 16 * 1024:
+                try:
+                    event = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                if event is None:
+                    done = True
+                    break
+                buf += event
+            # aiohttp's write() applies flow control itself, so no
+            # separate drain() round-trip is needed
+            await response.write(bytes(buf))
     except ConnectionResetError:
         # Client disconnected
         agent.stop()
+    finally:
+        if not producer.done():
+            producer.cancel()
 
     return response
 
 
+def _json_body(data) -> web.Response:
+    """200 JSON response encoded with _dumps instead of stdlib json."""
+    return web.Response(body=_dumps(data), content_type="application/json")
+
+
+# Idle answers for the endpoints dashboards and health checkers poll;
+# their bodies never vary, so serve the same bytes every time
+_IDLE_STATUS_BODY = b'{"state":"idle"}'
+_HEALTH_IDLE_BODY = b'{"status":"ok","agent":"idle"}'
+
+
 async def handle_status(request: web.Request) -> web.Response:
     """GET /status - Current agent status."""
-    return web.json_response(agent.status)
+    if agent.current_task is None:
+        return web.Response(body=_IDLE_STATUS_BODY,
+                            content_type="application/json")
+    return _json_body(agent.status)
 
 
 async def handle_health(request: web.Request) -> web.Response:
     """GET /health - Health check."""
-    return web.json_response({"status": "ok", "agent": agent.status.get("state", "idle")})
+    if agent.current_task is None:
+        return web.Response(body=_HEALTH_IDLE_BODY,
+                            content_type="application/json")
+    return _json_body({"status": "ok", "agent": agent.current_task.state})
 
 
 async def handle_stop(request: web.Request) -> web.Response:
@@ -244,11 +423,25 @@ async def handle_stop(request: web.Request) -> web.Response:
     return web.json_response({"status": "no task running"}, status=404)
 
 
-async def handle_history(request: web.Request) -> web.Response:
+async def handle_history(request: web.Request) -> web.StreamResponse:
     """GET /history - Recent task history."""
     limit = int(request.query.get("limit", "10"))
-    history = [asdict(t) for t in agent.history[-limit:]]
-    return web.json_response({"history": history})
+    # Newest `limit` entries in original order, without materializing
+    # the whole ring (deques don't slice)
+    recent = list(itertools.islice(reversed(agent.history), limit))[::-1]
+
+    # Stream one record at a time: peak memory is a single encoded task
+    # rather than the entire history (each with its output ring) built
+    # into one giant dict and serialized in a second pass
+    response = web.StreamResponse(
+        status=200, headers={"Content-Type": "application/json"})
+    await response.prepare(request)
+    await response.write(b'{"history":[')
+    for i, t in enumerate(recent):
+        await response.write((b"," if i else b"") + _dumps(t.to_dict()))
+    await response.write(b"]}")
+    await response.write_eof()
+    return response
 
 
 def create_app() -> web.Application:
@@ -262,6 +455,9 @@ def create_app() -> web.Application:
 
 
 def main():
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
     print(f"Claude-in-a-Box server starting on {HOST}:{PORT}")
     print(f"Workspace: {WORKSPACE}")
     print()